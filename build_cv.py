@@ -1,17 +1,31 @@
-# pip install reportlab qrcode[pil]
+# pip install reportlab qrcode
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+# Must be set before platypus is imported: keep the PDF /ID and creation
+# date stable instead of varying per run.
+import reportlab.rl_config
+reportlab.rl_config.invariant = 1
+
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import mm
 from reportlab.lib import colors
 from reportlab.platypus import (
-    BaseDocTemplate, Frame, PageTemplate,
-    Paragraph, Spacer, Image, Table, TableStyle, KeepInFrame
+    BaseDocTemplate, Flowable, Frame, PageTemplate,
+    Paragraph, Spacer, Table, TableStyle, KeepInFrame
 )
+from reportlab.pdfgen.canvas import Canvas
+from reportlab.pdfbase.pdfdoc import PDFArray, PDFDictionary, PDFName, PDFObjectReference, PDFString
+from reportlab.pdfbase.pdfmetrics import getFont
 from datetime import date
 from io import BytesIO
+from itertools import chain
+from typing import Any, Optional, Union
+import copy
+import functools
+import hashlib
+import json
 import qrcode
 import os
 
@@ -19,11 +33,19 @@ import os
 # CONFIG
 # -------------------------------------------------------------------
 LANDING_URL  = "https://apschram.github.io/curriculum-vitae/"     # QR points here
+QR_VERSION   = 4   # smallest version holding LANDING_URL (44 bytes) at level M
 PDF_URL      = "https://apschram.github.io/curriculum-vitae/Alexander_Schram_CV.pdf"
 LINKEDIN_URL = "https://www.linkedin.com/in/alexander-schram-17ab6265/"
 GITHUB_URL   = "https://github.com/apschram/curriculum-vitae"
 
 OUTPUT_PDF   = "Alexander_Schram_CV.pdf"
+MARGIN       = 18*mm
+FRAME_PAD    = 6       # ReportLab's default Frame padding; header aligns with body text
+HEADER_PAD   = 3       # top padding the header had as a Table cell
+HEADER_IMG   = 28*mm   # QR / headshot edge length
+HEADER_GAP   = 2*mm    # between title and contacts, contacts and QR, QR and headshot
+HEADER_SKIP  = 6*mm    # between header and body
+FOOTER_Y     = 12*mm
 ACCENT       = colors.HexColor("#0B7A75")
 BASE_FONT    = "Helvetica"
 BOLD_FONT    = "Helvetica-Bold"
@@ -31,10 +53,49 @@ BOLD_FONT    = "Helvetica-Bold"
 # Optional headshot (square works best). Leave as None to skip.
 HEADSHOT_PATH = None  # e.g. "AS.png"
 
+# Resolve both fonts once at import so text measuring below can use the
+# Font objects directly instead of going through the registry each time.
+_FONTS = {name: getFont(name) for name in (BASE_FONT, BOLD_FONT)}
+
+# -------------------------------------------------------------------
+# STYLES (built once at import; getSampleStyleSheet is not cheap)
+# -------------------------------------------------------------------
+_STYLES = getSampleStyleSheet()
+
+# Use unique names so we don’t collide with built-in styles
+if "NameLine" not in _STYLES:
+    _STYLES.add(ParagraphStyle(name="NameLine",   fontName=BOLD_FONT, fontSize=20, leading=23))
+    _STYLES.add(ParagraphStyle(name="SubLine",    fontName=BASE_FONT, fontSize=11, leading=14, textColor=colors.grey))
+    _STYLES.add(ParagraphStyle(name="H2Accent",   fontName=BOLD_FONT, fontSize=12.5, leading=16, spaceBefore=8, spaceAfter=4, textColor=ACCENT))
+    _STYLES.add(ParagraphStyle(name="BodyMain",   fontName=BASE_FONT, fontSize=10.5, leading=14))  # <- renamed
+    _STYLES.add(ParagraphStyle(name="BulletItem", fontName=BASE_FONT, fontSize=10.5, leading=14, leftIndent=10, bulletIndent=0))
+    _STYLES.add(ParagraphStyle(name="SmallNote",  fontName=BASE_FONT, fontSize=9.5, leading=12, textColor=colors.grey))
+
+# Whitespace-only flowables carry no per-use state, so one instance per
+# height (in mm) is shared by every place in the story that needs it.
+_SPACERS = {k: Spacer(1, k*mm) for k in (1, 2, 3, 4, 6)}
+
+# Table styles are validated once here and only merged into tables later.
+_ZERO_PAD_TOP = TableStyle([
+    ('VALIGN', (0,0), (-1,-1), 'TOP'),
+    ('LEFTPADDING',  (0,0), (-1,-1), 0),
+    ('RIGHTPADDING', (0,0), (-1,-1), 0),
+    ('TOPPADDING',   (0,0), (-1,-1), 0),
+    ('BOTTOMPADDING',(0,0), (-1,-1), 0),
+])
+_COLUMN_GUTTER = TableStyle([
+    ('RIGHTPADDING', (0,0), (-1,-1), 12),
+])
+
 # -------------------------------------------------------------------
 # CONTENT
 # -------------------------------------------------------------------
-DATA = {
+# (text, href or None) for one item of the header contact line
+ContactPart = tuple[str, Optional[str]]
+# (markup, style_name) for a paragraph, (None, k) for a k-mm spacer
+SpecEntry = tuple[Optional[str], Union[str, int]]
+
+DATA: dict[str, Any] = {
     "name": "Alexander Pieter Schram",
     "title": "Sports Analytics · Tracking & Modeling",
     "location": "Amsterdam, NL",
@@ -121,149 +182,283 @@ DATA = {
     }
 }
 
+def _contact_parts(data: dict[str, Any]) -> list[ContactPart]:
+    parts: list[ContactPart] = []
+    if data.get("email"):    parts.append((data["email"], f'mailto:{data["email"]}'))
+    if data.get("phone"):    parts.append((data["phone"], None))
+    if data.get("location"): parts.append((data["location"], None))
+    for label, url in data.get("links", {}).items():
+        if url:
+            parts.append((label, url))
+    return parts
+
+# Contacts/links are static, so they are collected once.
+_CONTACT_PARTS = _contact_parts(DATA)
+
+# Body content pre-rendered to flat (markup, style_name) specs at import;
+# an entry of (None, k) stands for the shared k-mm Spacer. build_pdf only
+# turns these into flowables.
+_MAIN_SPEC: list[SpecEntry] = []
+if DATA.get("summary"):
+    _MAIN_SPEC += [("Summary", "H2Accent"), (DATA["summary"], "BodyMain"), (None, 3)]
+_MAIN_SPEC.append(("Experience", "H2Accent"))
+_MAIN_SPEC.extend(chain.from_iterable(
+    (
+        (f"<b>{job['company']} — {job['role']} ({job['dates']})</b>", "BodyMain"),
+        *[(f"• {b}", "BulletItem") for b in job.get("bullets", ())],
+        (None, 1),
+    )
+    for job in DATA["experience"]
+))
+
+_LEFT_COL_SPEC: list[SpecEntry] = [
+    ("Technical", "H2Accent"),
+    (DATA["tech"], "BodyMain"),
+    (None, 2),
+    ("Education", "H2Accent"),
+    *[(item, "BodyMain") for item in DATA["education"]],
+]
+_RIGHT_COL_SPEC: list[SpecEntry] = [
+    ("Languages", "H2Accent"),
+    (DATA["languages"], "BodyMain"),
+    (None, 2),
+    ("Data Providers", "H2Accent"),
+    (DATA["providers"], "BodyMain"),
+]
+
 # -------------------------------------------------------------------
 # HELPERS
 # -------------------------------------------------------------------
-def make_qr(url: str, box_size=6) -> BytesIO:
+@functools.lru_cache(maxsize=None)
+def make_qr(url: str, border: int = 2, version: int = QR_VERSION) -> tuple[int, ...]:
+    # Module matrix (border included), one int per row with bit j set for a
+    # dark module in column j; drawn as vectors by draw_qr(), so no raster
+    # image is ever produced.
     qr = qrcode.QRCode(
-        version=None,
+        version=version,
         error_correction=qrcode.constants.ERROR_CORRECT_M,
-        box_size=box_size,
-        border=2
+        border=border
     )
     qr.add_data(url)
-    qr.make(fit=True)
-    img = qr.make_image(fill_color="black", back_color="white")
-    bio = BytesIO()
-    img.save(bio, format="PNG")
-    bio.seek(0)
-    return bio
-
-def footer(canvas, doc):
+    qr.make(fit=False)
+    return tuple(
+        int("".join("1" if v else "0" for v in reversed(row)), 2)
+        for row in qr.get_matrix()
+    )
+
+def draw_qr(canvas: Canvas, rows: tuple[int, ...], x: float, y: float, size: float) -> None:
+    # One rectangle per horizontal run of dark modules, all filled in a
+    # single path operation. Runs are peeled off the packed row with bit
+    # tricks rather than by testing each module.
+    s = size / len(rows)
+    path = canvas.beginPath()
+    for i, bits in enumerate(rows):
+        row_y = y + size - (i + 1)*s
+        while bits:
+            low = bits & -bits                 # first dark module of the run
+            after = (bits + low) & ~bits       # first light module after it
+            start = low.bit_length() - 1
+            path.rect(x + start*s, row_y, (after.bit_length() - 1 - start)*s, s)
+            bits &= bits + low                 # clear the run
+    canvas.setFillColor(colors.black)
+    canvas.drawPath(path, stroke=0, fill=1)
+
+@functools.lru_cache(maxsize=256)
+def _parse_para(text: str, style_name: str) -> Paragraph:
+    return Paragraph(text, _STYLES[style_name])
+
+def _para(text: str, style_name: str) -> Paragraph:
+    # Paragraph keeps per-wrap state, so hand out a shallow copy of the
+    # cached instance; that still skips re-running the markup parser.
+    return copy.copy(_parse_para(text, style_name))
+
+def _flowables(spec: list[SpecEntry]) -> list[Flowable]:
+    flowables: list[Flowable] = []
+    for text, arg in spec:
+        if isinstance(arg, int):
+            flowables.append(_SPACERS[arg])
+        else:
+            assert text is not None
+            flowables.append(_para(text, arg))
+    return flowables
+
+def _content_key() -> str:
+    # Everything that ends up in the PDF: content, QR target, footer date,
+    # the headshot image (if present) and this script itself (so layout
+    # edits also invalidate the cached output).
+    with open(__file__, "rb") as f:
+        source = f.read()
+    h = hashlib.sha1(json.dumps(DATA, sort_keys=True, default=str).encode())
+    h.update(f"|{LANDING_URL}|{HEADSHOT_PATH}|{date.today().isoformat()}|".encode())
+    if HEADSHOT_PATH and os.path.exists(HEADSHOT_PATH):
+        with open(HEADSHOT_PATH, "rb") as f:
+            h.update(f.read())
+    h.update(b"|")
+    h.update(source)
+    return h.hexdigest()
+
+def _wrap_contacts(parts: list[ContactPart], width: float, font: str, size: float) -> list[list[ContactPart]]:
+    # Greedy line breaking between items; each line is a list of (text, href).
+    sep = " · "
+    measure = _FONTS[font].stringWidth
+    sep_w = measure(sep, size)
+    lines: list[list[ContactPart]] = []
+    line: list[ContactPart] = []
+    used = 0.0
+    for text, href in parts:
+        w = measure(text, size)
+        if line and used + sep_w + w > width:
+            line.append((sep.rstrip(), None))   # keep the separator at the break
+            lines.append(line)
+            line, used = [], 0.0
+        if line:
+            line.append((sep, None))
+            used += sep_w
+        line.append((text, href))
+        used += w
+    if line:
+        lines.append(line)
+    return lines
+
+@functools.lru_cache(maxsize=None)
+def _header_layout() -> tuple[float, float, float, list[list[ContactPart]], float]:
+    """Static header geometry: (x, top, img_x, contact lines, height)."""
+    x = MARGIN + FRAME_PAD
+    top = A4[1] - MARGIN - FRAME_PAD - HEADER_PAD
+    img_x = A4[0] - MARGIN - FRAME_PAD - HEADER_IMG
+    body = _STYLES["BodyMain"]
+    lines = _wrap_contacts(_CONTACT_PARTS, img_x - HEADER_GAP - x, body.fontName, body.fontSize)
+
+    left_h = _STYLES["NameLine"].leading + _STYLES["SubLine"].leading + HEADER_GAP + len(lines)*body.leading
+    right_h = HEADER_IMG
+    if HEADSHOT_PATH and os.path.exists(HEADSHOT_PATH):
+        right_h += HEADER_GAP + HEADER_IMG
+    return x, top, img_x, lines, max(left_h, right_h)
+
+def header(canvas: Canvas, doc: BaseDocTemplate) -> None:
+    # Name, title, contacts/links (left) + QR (+ optional headshot) (right),
+    # drawn straight onto the canvas: the header never moves, so it needs
+    # none of Platypus' wrap/split machinery.
+    x, top, img_x, lines, _ = _header_layout()
+    canvas.saveState()
+
+    y = top
+    for text, style_name in ((DATA["name"], "NameLine"), (DATA["title"], "SubLine")):
+        st = _STYLES[style_name]
+        canvas.setFont(st.fontName, st.fontSize)
+        canvas.setFillColor(st.textColor)
+        canvas.drawString(x, y - st.fontSize, text)
+        y -= st.leading
+    y -= HEADER_GAP
+
+    st = _STYLES["BodyMain"]
+    canvas.setFont(st.fontName, st.fontSize)
+    canvas.setFillColor(st.textColor)
+    for line in lines:
+        baseline = y - st.fontSize
+        canvas.drawString(x, baseline, "".join(text for text, _ in line))
+        cx = x
+        for text, href in line:
+            w = _FONTS[st.fontName].stringWidth(text, st.fontSize)
+            if href:
+                link_url(canvas, href, (cx, baseline - 0.2*st.fontSize, cx + w, baseline + st.fontSize))
+            cx += w
+        y -= st.leading
+
+    # QR links to the landing page
+    draw_qr(canvas, make_qr(LANDING_URL), img_x, top - HEADER_IMG, HEADER_IMG)
+    if HEADSHOT_PATH and os.path.exists(HEADSHOT_PATH):
+        canvas.drawImage(HEADSHOT_PATH, img_x, top - 2*HEADER_IMG - HEADER_GAP, HEADER_IMG, HEADER_IMG,
+                         preserveAspectRatio=True)
+    canvas.restoreState()
+
+def footer(canvas: Canvas, doc: BaseDocTemplate) -> None:
     canvas.saveState()
     canvas.setFont(BASE_FONT, 8)
     canvas.setFillColor(colors.grey)
     today = date.today().strftime("%Y.%m.%d")
     left = f"Generated with Python — v{today}"
     right = "© Alexander Schram"
-    canvas.drawString(18*mm, 12*mm, left)
-    canvas.drawRightString(A4[0]-18*mm, 12*mm, right)
+    canvas.drawString(MARGIN, FOOTER_Y, left)
+    canvas.drawRightString(A4[0]-MARGIN, FOOTER_Y, right)
     canvas.restoreState()
 
+def link_url(canvas: Canvas, url: str, rect: tuple[float, float, float, float]) -> None:
+    # Like canvas.linkURL, but all annotations pointing at the same URL share
+    # one indirect URI action, so each URL is written once per document no
+    # matter how many pages repeat the header.
+    pdf = canvas._doc
+    name = "URIAction." + hashlib.sha1(url.encode()).hexdigest()
+    if name in pdf.idToObject:
+        action = PDFObjectReference(name)
+    else:
+        action = pdf.Reference(PDFDictionary({
+            "Type": PDFName("Action"),
+            "S": PDFName("URI"),
+            "URI": PDFString(url),
+        }), name)
+    ann = PDFDictionary()
+    ann["Type"] = PDFName("Annot")
+    ann["Subtype"] = PDFName("Link")
+    ann["Rect"] = PDFArray(canvas._absRect(rect))
+    ann["A"] = action
+    ann["Border"] = PDFArray([0, 0, 0])
+    canvas._addAnnotation(ann)
+
+def decorate(canvas: Canvas, doc: BaseDocTemplate) -> None:
+    header(canvas, doc)
+    footer(canvas, doc)
+
 # -------------------------------------------------------------------
 # BUILD
 # -------------------------------------------------------------------
-def build_pdf(path: str = OUTPUT_PDF):
-    styles = getSampleStyleSheet()
-
-    # Use unique names so we don’t collide with built-in styles
-    styles.add(ParagraphStyle(name="NameLine",   fontName=BOLD_FONT, fontSize=20, leading=23))
-    styles.add(ParagraphStyle(name="SubLine",    fontName=BASE_FONT, fontSize=11, leading=14, textColor=colors.grey))
-    styles.add(ParagraphStyle(name="H2Accent",   fontName=BOLD_FONT, fontSize=12.5, leading=16, spaceBefore=8, spaceAfter=4, textColor=ACCENT))
-    styles.add(ParagraphStyle(name="BodyMain",   fontName=BASE_FONT, fontSize=10.5, leading=14))  # <- renamed
-    styles.add(ParagraphStyle(name="BulletItem", fontName=BASE_FONT, fontSize=10.5, leading=14, leftIndent=10, bulletIndent=0))
-    styles.add(ParagraphStyle(name="SmallNote",  fontName=BASE_FONT, fontSize=9.5, leading=12, textColor=colors.grey))
-
-    margin = 18*mm
-    frame = Frame(margin, margin, A4[0]-2*margin, A4[1]-2*margin, id="frame")
-    doc = BaseDocTemplate(path, pagesize=A4, leftMargin=0, rightMargin=0, topMargin=0, bottomMargin=0)
-    doc.addPageTemplates(PageTemplate(id="page", frames=[frame], onPage=footer))
-
-    story = []
-
-    # Header: name, title, contacts/links (left) + QR (+ optional headshot) (right)
-    name_p  = Paragraph(DATA["name"], styles["NameLine"])
-    title_p = Paragraph(DATA["title"], styles["SubLine"])
-
-    parts = []
-    if DATA.get("email"):    parts.append(f'<link href="mailto:{DATA["email"]}">{DATA["email"]}</link>')
-    if DATA.get("phone"):    parts.append(DATA["phone"])
-    if DATA.get("location"): parts.append(DATA["location"])
-    for label, url in DATA.get("links", {}).items():
-        if url:
-            parts.append(f'<link href="{url}">{label}</link>')
-    contact_p = Paragraph(" · ".join(parts), styles["BodyMain"])
+def build_pdf(path: str = OUTPUT_PDF) -> None:
+    # Skip the rebuild when none of the inputs changed since the PDF on disk
+    # was written. The output is not necessarily byte-identical between
+    # renders (column widths can shift by a point), but it is equivalent.
+    key = _content_key()
+    stamp = path + ".sha1"
+    if os.path.exists(path) and os.path.exists(stamp):
+        with open(stamp, encoding="utf-8") as f:
+            if f.read() == key:
+                return
 
-    left_stack = [name_p, title_p, Spacer(1, 2*mm), contact_p]
-    left_flow  = KeepInFrame(0, 0, left_stack, hAlign="LEFT")
+    pdf = render_pdf()
+    # One write of the finished document instead of ReportLab's many small ones
+    with open(path, "wb") as f:
+        f.write(pdf)
+    with open(stamp, "w", encoding="utf-8") as f:
+        f.write(key)
 
-    # QR links to the landing page
-    qr_img_bio = make_qr(LANDING_URL)
-    qr_img = Image(qr_img_bio, width=28*mm, height=28*mm)
+def render_pdf() -> bytes:
+    """Lay out the CV in memory and return the PDF bytes."""
+    # The header is drawn by decorate(); the frame only holds the body.
+    # The first heading now sits at the frame top, where ReportLab drops its
+    # spaceBefore; reserve it here so the body starts where it always did.
+    header_h = HEADER_PAD + _header_layout()[-1] + HEADER_SKIP + _STYLES["H2Accent"].spaceBefore
+    frame = Frame(MARGIN, MARGIN, A4[0]-2*MARGIN, A4[1]-2*MARGIN-header_h, id="frame")
+    buf = BytesIO()
+    doc = BaseDocTemplate(buf, pagesize=A4, leftMargin=0, rightMargin=0, topMargin=0, bottomMargin=0)
+    doc.addPageTemplates(PageTemplate(id="page", frames=[frame], onPage=decorate))
 
-    right_cells = [[qr_img]]
-    if HEADSHOT_PATH and os.path.exists(HEADSHOT_PATH):
-        right_cells += [[Spacer(1, 2*mm)], [Image(HEADSHOT_PATH, width=28*mm, height=28*mm)]]
-
-    right_tbl = Table(right_cells, colWidths=[30*mm])
-    right_tbl.setStyle(TableStyle([
-        ('VALIGN', (0,0), (-1,-1), 'TOP'),
-        ('ALIGN',  (0,0), (-1,-1), 'RIGHT'),
-        ('LEFTPADDING',  (0,0), (-1,-1), 0),
-        ('RIGHTPADDING', (0,0), (-1,-1), 0),
-        ('TOPPADDING',   (0,0), (-1,-1), 0),
-        ('BOTTOMPADDING',(0,0), (-1,-1), 0),
-    ]))
-
-    header_row = Table([[left_flow, right_tbl]], colWidths=[None, 30*mm])
-    header_row.setStyle(TableStyle([
-        ('VALIGN', (0,0), (-1,-1), 'TOP'),
-        ('LEFTPADDING',  (0,0), (-1,-1), 0),
-        ('RIGHTPADDING', (0,0), (-1,-1), 0),
-        ('BOTTOMPADDING',(0,0), (-1,-1), 0),
-    ]))
-
-    story += [header_row, Spacer(1, 6*mm)]
-
-    # Summary
-    if DATA.get("summary"):
-        story += [
-            Paragraph("Summary", styles["H2Accent"]),
-            Paragraph(DATA["summary"], styles["BodyMain"]),
-            Spacer(1, 3*mm)
-        ]
-
-    # Experience
-    story.append(Paragraph("Experience", styles["H2Accent"]))
-    for job in DATA["experience"]:
-        head = f"<b>{job['company']} — {job['role']} ({job['dates']})</b>"
-        story.append(Paragraph(head, styles["BodyMain"]))
-        for b in job.get("bullets", []):
-            story.append(Paragraph(f"• {b}", styles["BulletItem"]))
-        story.append(Spacer(1, 1*mm))
+    story = _flowables(_MAIN_SPEC)
 
     # Two-column block: Tech/Education vs Languages/Providers
-    left_col = [
-        Paragraph("Technical", styles["H2Accent"]),
-        Paragraph(DATA["tech"], styles["BodyMain"]),
-        Spacer(1, 2*mm),
-        Paragraph("Education", styles["H2Accent"]),
-        *[Paragraph(item, styles["BodyMain"]) for item in DATA["education"]],
-    ]
-    right_col = [
-        Paragraph("Languages", styles["H2Accent"]),
-        Paragraph(DATA["languages"], styles["BodyMain"]),
-        Spacer(1, 2*mm),
-        Paragraph("Data Providers", styles["H2Accent"]),
-        Paragraph(DATA["providers"], styles["BodyMain"]),
-    ]
+    left_col  = _flowables(_LEFT_COL_SPEC)
+    right_col = _flowables(_RIGHT_COL_SPEC)
 
     left_kif  = KeepInFrame(0, 0, left_col,  hAlign="LEFT")
     right_kif = KeepInFrame(0, 0, right_col, hAlign="LEFT")
 
     two_col = Table([[left_kif, right_kif]], colWidths=[None, None])
-    two_col.setStyle(TableStyle([
-        ('VALIGN', (0,0), (-1,-1), 'TOP'),
-        ('LEFTPADDING',  (0,0), (-1,-1), 0),
-        ('RIGHTPADDING', (0,0), (-1,-1), 12),
-        ('TOPPADDING',   (0,0), (-1,-1), 0),
-        ('BOTTOMPADDING',(0,0), (-1,-1), 0),
-    ]))
+    two_col.setStyle(_ZERO_PAD_TOP)
+    two_col.setStyle(_COLUMN_GUTTER)
 
-    story += [Spacer(1, 4*mm), two_col, Spacer(1, 6*mm)]
-    story += [Paragraph("Generated with Python — links above for PDF · GitHub · LinkedIn.", styles["SmallNote"])]
+    story += [_SPACERS[4], two_col, _SPACERS[6]]
+    story += [_para("Generated with Python — links above for PDF · GitHub · LinkedIn.", "SmallNote")]
 
     doc.build(story)
+    return buf.getvalue()
 
 if __name__ == "__main__":
     build_pdf(OUTPUT_PDF)